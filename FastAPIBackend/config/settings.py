@@ -1,5 +1,6 @@
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
+from functools import lru_cache
 import os
 
 
@@ -26,20 +27,18 @@ class Settings(BaseSettings):
     # Facilities Configuration Path
     facilities_config_path: str = "config/facilities.json"
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
-    
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        # Override from environment variables if not set
-        if not self.openai_api_key:
-            self.openai_api_key = os.getenv("OPENAI_API_KEY", "")
-        if not self.google_calendar_id:
-            self.google_calendar_id = os.getenv("GOOGLE_CALENDAR_ID", "")
-        if not self.session_secret:
-            self.session_secret = os.getenv("SESSION_SECRET", "")
+    # Containers usually ship no .env file; skip the dotenv read entirely then
+    model_config = SettingsConfigDict(
+        env_file=".env" if os.path.exists(".env") else None,
+        case_sensitive=False
+    )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Get the cached settings instance (use with Depends for overrides)"""
+    return Settings()
 
 
 # Global settings instance
-settings = Settings()
+settings = get_settings()
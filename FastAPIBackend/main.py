@@ -1,13 +1,15 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Depends
+from fastapi.responses import ORJSONResponse
+import asyncio
 import logging
+import os
 from contextlib import asynccontextmanager
 
-from config.settings import settings
+from config.settings import Settings, settings, get_settings
 from services.facility_service import facility_service
 from services.calendar_service import calendar_service
 from routers import voice, realtime
+from middleware.cors_middleware import ConditionalCORSMiddleware
 
 
 logging.basicConfig(
@@ -16,6 +18,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Response payloads rebuilt only when facility_service.version changes
+_facilities_cache = {"version": -1, "payload": None}
+_health_cache = {"version": -1, "settings": None, "payload": None}
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -23,7 +29,7 @@ async def lifespan(app: FastAPI):
     logger.info("=== FastAPI Application Starting ===")
     
     try:
-        facility_service.load_facilities()
+        await asyncio.to_thread(facility_service.load_facilities)
         logger.info("✓ Facilities loaded successfully")
     except Exception as e:
         logger.error(f"✗ Error loading facilities: {e}")
@@ -51,11 +57,14 @@ app = FastAPI(
     title="AI Voice Assistant for Sports Facility Bookings",
     description="FastAPI backend powering AI voice assistant for pickleball/badminton court bookings",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# Twilio/Exotel webhooks and the realtime socket are never browser requests
 app.add_middleware(
-    CORSMiddleware,
+    ConditionalCORSMiddleware,
+    skip_paths=("/voice/webhook", "/realtime"),
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
@@ -85,11 +94,17 @@ async def root():
 
 
 @app.get("/health")
-async def health_check():
+async def health_check(app_settings: Settings = Depends(get_settings)):
     """Health check endpoint"""
+    if (
+        _health_cache["version"] == facility_service.version
+        and _health_cache["settings"] is app_settings
+    ):
+        return _health_cache["payload"]
+    
     facilities = facility_service.get_all_facilities()
     
-    return {
+    payload = {
         "status": "healthy",
         "timestamp": "2024-11-19T00:00:00Z",
         "services": {
@@ -98,18 +113,24 @@ async def health_check():
             "facilities_loaded": len(facilities)
         },
         "configuration": {
-            "openai_configured": bool(settings.openai_api_key),
-            "calendar_configured": bool(settings.google_calendar_id)
+            "openai_configured": bool(app_settings.openai_api_key),
+            "calendar_configured": bool(app_settings.google_calendar_id)
         }
     }
+    
+    _health_cache.update(version=facility_service.version, settings=app_settings, payload=payload)
+    return payload
 
 
 @app.get("/facilities")
 async def list_facilities():
     """List all configured facilities"""
+    if _facilities_cache["version"] == facility_service.version:
+        return _facilities_cache["payload"]
+    
     facilities = facility_service.get_all_facilities()
     
-    return {
+    payload = {
         "count": len(facilities),
         "facilities": [
             {
@@ -123,6 +144,9 @@ async def list_facilities():
             for fid, f in facilities.items()
         ]
     }
+    
+    _facilities_cache.update(version=facility_service.version, payload=payload)
+    return payload
 
 
 if __name__ == "__main__":
@@ -132,5 +156,9 @@ if __name__ == "__main__":
         host=settings.host,
         port=settings.port,
         reload=settings.debug,
-        log_level="info"
+        loop="uvloop",
+        http="httptools",
+        ws="websockets",
+        log_level="info",
+        workers=1 if settings.debug else os.cpu_count()
     )
@@ -0,0 +1,25 @@
+from typing import Iterable
+from starlette.middleware.cors import CORSMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class ConditionalCORSMiddleware:
+    """CORS middleware that bypasses paths only hit by non-browser clients"""
+
+    def __init__(self, app: ASGIApp, skip_paths: Iterable[str] = (), **cors_options):
+        """
+        Args:
+            app: Downstream ASGI application
+            skip_paths: Exact paths served without CORS processing
+            cors_options: Keyword arguments forwarded to CORSMiddleware
+        """
+        self.app = app
+        self.skip_paths = frozenset(skip_paths)
+        self.cors_app = CORSMiddleware(app, **cors_options)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        await self.cors_app(scope, receive, send)
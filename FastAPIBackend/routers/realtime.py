@@ -1,35 +1,108 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
+from pydantic import ValidationError
 from typing import Optional
-import json
+import orjson
 import logging
 import asyncio
-from datetime import datetime
+import itertools
+import secrets
+import time
+from collections import deque
+from contextlib import suppress
 
 from services.facility_service import facility_service
 from services.booking_service import booking_service
 from schemas.function_call_schemas import (
     CheckAvailabilityRequest,
     CreateBookingRequest,
-    FUNCTION_DEFINITIONS
+    FUNCTION_DEFINITIONS_BYTES
 )
 
 router = APIRouter(tags=["realtime"])
 logger = logging.getLogger(__name__)
 
+# Per-process prefix plus a monotonic counter keeps session ids unique
+# across uvicorn workers without touching the clock
+_SESSION_PREFIX = secrets.token_hex(4)
+_session_counter = itertools.count(1).__next__
+
+# function_name -> (argument validator, booking handler), built once at import
+_DISPATCH = {
+    "check_availability": (CheckAvailabilityRequest.model_validate, booking_service.check_availability),
+    "create_booking": (CreateBookingRequest.model_validate, booking_service.create_booking),
+}
+
+
+async def _send_frame(websocket: WebSocket, frame: bytes) -> None:
+    """Send pre-serialized JSON as a text frame, so clients receive a string"""
+    await websocket.send_text(frame.decode("utf-8"))
+
+
+async def _send_json(websocket: WebSocket, payload: dict) -> None:
+    """Serialize with orjson and send as a single text frame"""
+    await _send_frame(websocket, orjson.dumps(payload))
+
+
+# Sent whenever a client frame is not valid JSON
+INVALID_JSON_FRAME = orjson.dumps({"type": "error", "error": "Invalid JSON format"})
+
+# Audio frames arrive at 50+/s per call, so only every Nth one is logged
+AUDIO_LOG_INTERVAL = 500
+
+# Audio acks are buffered and flushed as one "batch" frame this long after the first arrives
+ACK_FLUSH_INTERVAL = 0.01
+
+
+async def _flush_acks(websocket: WebSocket, acks: deque, pending: asyncio.Event) -> None:
+    """Send buffered (timestamp, kind) acks; idle until the audio branch sets pending"""
+    while True:
+        await pending.wait()
+        await asyncio.sleep(ACK_FLUSH_INTERVAL)
+        pending.clear()
+        batch = list(acks)
+        acks.clear()
+        await _send_json(websocket, {"type": "batch", "acks": batch})
+
+
+def _session_created_frame(session: "RealtimeSession") -> bytes:
+    """Build the session.created frame around the pre-serialized functions"""
+    return (
+        b'{"type":"session.created","session_id":' + orjson.dumps(session.session_id)
+        + b',"facility":' + orjson.dumps(session.facility.facility_name)
+        + b',"system_prompt":' + orjson.dumps(session.get_system_prompt())
+        + b',"functions":' + FUNCTION_DEFINITIONS_BYTES + b'}'
+    )
+
+
+def _function_result_frame(function_name: str, result: bytes) -> bytes:
+    """Wrap an already serialized function result in a function_result frame"""
+    return (
+        b'{"type":"function_result","function_name":' + orjson.dumps(function_name)
+        + b',"result":' + result + b'}'
+    )
+
 
 class RealtimeSession:
     """Manages a single OpenAI Realtime API session"""
     
+    __slots__ = ("facility_id", "caller_number", "session_id", "facility", "audio_frames", "_system_prompt")
+    
     def __init__(self, facility_id: str, caller_number: Optional[str] = None):
         self.facility_id = facility_id
         self.caller_number = caller_number
-        self.session_id = f"session_{facility_id}_{datetime.utcnow().timestamp()}"
+        self.session_id = f"session_{facility_id}_{_SESSION_PREFIX}{_session_counter()}"
         self.facility = facility_service.get_facility_by_id(facility_id)
+        self.audio_frames = 0
         
         if not self.facility:
             raise ValueError(f"Facility not found: {facility_id}")
+        
+        system_prompt = facility_service.get_facility_system_prompt(self.facility)
+        if caller_number:
+            system_prompt += f"\n\nCALLER ID: {caller_number}"
+        self._system_prompt = system_prompt
     
-    def handle_function_call(self, function_name: str, arguments: dict) -> dict:
+    async def handle_function_call(self, function_name: str, arguments: dict) -> bytes:
         """
         Handle function calls from OpenAI Realtime API
         
@@ -38,44 +111,39 @@ class RealtimeSession:
             arguments: Function arguments
         
         Returns:
-            Function result as a dictionary
+            Function result serialized as JSON bytes
         """
+        entry = _DISPATCH.get(function_name)
+        if entry is None:
+            return orjson.dumps({
+                "success": False,
+                "error": f"Unknown function: {function_name}"
+            })
+        
+        validate, handler = entry
         try:
-            if function_name == "check_availability":
-                request = CheckAvailabilityRequest(**arguments)
-                response = booking_service.check_availability(request)
-                return response.model_dump()
-            
-            elif function_name == "create_booking":
-                request = CreateBookingRequest(**arguments)
-                response = booking_service.create_booking(request)
-                return response.model_dump()
-            
-            else:
-                return {
-                    "success": False,
-                    "error": f"Unknown function: {function_name}"
-                }
+            request = validate(arguments)
+        except ValidationError as e:
+            logger.warning("Invalid arguments for %s: %s", function_name, e)
+            return orjson.dumps({
+                "success": False,
+                "error": f"Invalid arguments for {function_name}: {e}"
+            })
         
+        try:
+            response = await handler(request)
+            # Serialize straight to JSON bytes in pydantic-core, no intermediate dict
+            return response.__pydantic_serializer__.to_json(response, warnings=False, exclude_none=True)
         except Exception as e:
-            logger.error(f"Error handling function call {function_name}: {e}")
-            return {
+            logger.error("Error handling function call %s: %s", function_name, e)
+            return orjson.dumps({
                 "success": False,
                 "error": f"Error executing {function_name}: {str(e)}"
-            }
+            })
     
     def get_system_prompt(self) -> str:
         """Get system prompt for this facility"""
-        if not self.facility:
-            raise ValueError("Facility not initialized")
-        
-        base_prompt = facility_service.get_facility_system_prompt(self.facility)
-        
-        if self.caller_number:
-            base_prompt += f"\n\nCALLER ID: {self.caller_number}"
-        
-        return base_prompt
-
+        return self._system_prompt
 
 @router.websocket("/realtime")
 async def realtime_websocket(
@@ -104,77 +172,72 @@ async def realtime_websocket(
     """
     await websocket.accept()
     session = None
+    acks = deque()
+    acks_pending = asyncio.Event()
+    flush_task = None
     
     try:
         session = RealtimeSession(facility_id, caller_number)
-        logger.info(f"Realtime session started: {session.session_id}")
+        logger.info("Realtime session started: %s", session.session_id)
         
-        if not session.facility:
-            raise ValueError("Facility not initialized")
-        
-        await websocket.send_json({
-            "type": "session.created",
-            "session_id": session.session_id,
-            "facility": session.facility.facility_name,
-            "system_prompt": session.get_system_prompt(),
-            "functions": FUNCTION_DEFINITIONS
-        })
+        await _send_frame(websocket, _session_created_frame(session))
+        flush_task = asyncio.create_task(_flush_acks(websocket, acks, acks_pending))
         
         while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                logger.info("WebSocket disconnected: %s", session.session_id)
+                return
+            
+            raw = message.get("bytes")
+            if raw is None:
+                raw = message.get("text", "")
+            
             try:
-                message = await websocket.receive_text()
-                data = json.loads(message)
-                
-                message_type = data.get("type")
-                
-                if message_type == "function_call":
-                    function_name = data.get("function_name")
-                    arguments = data.get("arguments", {})
-                    
-                    logger.info(f"Function call: {function_name} with args: {arguments}")
-                    
-                    result = session.handle_function_call(function_name, arguments)
-                    
-                    await websocket.send_json({
-                        "type": "function_result",
-                        "function_name": function_name,
-                        "result": result
-                    })
-                
-                elif message_type == "audio":
-                    logger.debug("Received audio data")
-                    await websocket.send_json({
-                        "type": "audio_received",
-                        "timestamp": datetime.utcnow().isoformat()
-                    })
-                
-                elif message_type == "session.update":
-                    logger.info("Session update received")
-                    await websocket.send_json({
-                        "type": "session.updated",
-                        "session_id": session.session_id
-                    })
-                
-                elif message_type == "ping":
-                    await websocket.send_json({"type": "pong"})
+                data = orjson.loads(raw)
+            except orjson.JSONDecodeError as e:
+                logger.error("Invalid JSON received: %s", e)
+                await _send_frame(websocket, INVALID_JSON_FRAME)
+                continue
+            
+            message_type = data.get("type")
+            
+            if message_type == "function_call":
+                function_name = data.get("function_name")
+                arguments = data.get("arguments", {})
                 
-                else:
-                    logger.warning(f"Unknown message type: {message_type}")
+                logger.info("Function call: %s with args: %s", function_name, arguments)
                 
-            except json.JSONDecodeError as e:
-                logger.error(f"Invalid JSON received: {e}")
-                await websocket.send_json({
-                    "type": "error",
-                    "error": "Invalid JSON format"
+                result = await session.handle_function_call(function_name, arguments)
+                await _send_frame(websocket, _function_result_frame(function_name, result))
+            
+            elif message_type == "audio":
+                session.audio_frames += 1
+                if session.audio_frames % AUDIO_LOG_INTERVAL == 0:
+                    logger.debug("Received %d audio frames", session.audio_frames)
+                acks.append((time.time(), "audio_received"))
+                acks_pending.set()
+            
+            elif message_type == "session.update":
+                logger.info("Session update received")
+                await _send_json(websocket, {
+                    "type": "session.updated",
+                    "session_id": session.session_id
                 })
+            
+            elif message_type == "ping":
+                await _send_json(websocket, {"type": "pong"})
+            
+            else:
+                logger.warning("Unknown message type: %s", message_type)
     
     except WebSocketDisconnect:
-        logger.info(f"WebSocket disconnected: {session.session_id if session else 'unknown'}")
+        logger.info("WebSocket disconnected: %s", session.session_id if session else "unknown")
     
     except Exception as e:
-        logger.error(f"Error in realtime WebSocket: {e}")
+        logger.error("Error in realtime WebSocket: %s", e)
         try:
-            await websocket.send_json({
+            await _send_json(websocket, {
                 "type": "error",
                 "error": str(e)
             })
@@ -182,6 +245,10 @@ async def realtime_websocket(
             pass
     
     finally:
+        if flush_task:
+            flush_task.cancel()
+            with suppress(asyncio.CancelledError, Exception):
+                await flush_task
         logger.info("Realtime session ended")
 
 
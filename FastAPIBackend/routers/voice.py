@@ -1,11 +1,74 @@
 from fastapi import APIRouter, Request, Response
 from fastapi.responses import PlainTextResponse
 from services.facility_service import facility_service
+from schemas.booking_schemas import Facility
+from utils.phone_utils import normalize_phone_number
+from typing import Dict, Mapping, Optional
+from functools import lru_cache
+from urllib.parse import parse_qsl
+from xml.sax.saxutils import escape
 import logging
 
 router = APIRouter(prefix="/voice", tags=["voice"])
 logger = logging.getLogger(__name__)
 
+NOT_CONFIGURED_TWIML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<Response>
+    <Say>We're sorry, this facility is not configured. Please try again later.</Say>
+    <Hangup/>
+</Response>"""
+
+ERROR_TWIML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<Response>
+    <Say>We're sorry, an error occurred. Please try again later.</Say>
+    <Hangup/>
+</Response>"""
+
+WELCOME_TWIML_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<Response>
+    <Say>Welcome to {facility_name}. Please hold while we connect you to our AI assistant.</Say>
+    <Pause length="1"/>
+    <Say>This is a demo webhook. In production, this would connect to the OpenAI Realtime API via WebSocket.</Say>
+</Response>"""
+
+# Encoded welcome TwiML per facility_id, rebuilt whenever facilities are reloaded
+_welcome_twiml_cache = {"version": -1, "twiml": {}}
+
+
+def _build_welcome_twiml() -> Dict[str, bytes]:
+    """Render and encode the welcome TwiML for every loaded facility"""
+    return {
+        fid: WELCOME_TWIML_TEMPLATE.format(facility_name=escape(f.facility_name)).encode("utf-8")
+        for fid, f in facility_service.get_all_facilities().items()
+    }
+
+
+def _get_welcome_twiml(facility: Facility) -> bytes:
+    """Get the pre-rendered welcome TwiML for a facility"""
+    if _welcome_twiml_cache["version"] != facility_service.version:
+        _welcome_twiml_cache.update(version=facility_service.version, twiml=_build_welcome_twiml())
+    
+    return _welcome_twiml_cache["twiml"][facility.facility_id]
+
+
+# Providers retry webhooks with the same called number, so cache its
+# normalized form; the facility itself is read live from by_phone
+_normalize_called_number = lru_cache(maxsize=256)(normalize_phone_number)
+
+
+def _lookup_facility(to_number: str) -> Optional[Facility]:
+    """Resolve the called number to a facility via the normalized phone index"""
+    return facility_service.by_phone.get(_normalize_called_number(to_number))
+
+
+async def _read_webhook_fields(request: Request) -> Mapping[str, str]:
+    """Read webhook form fields, parsing urlencoded bodies without Starlette's form parser"""
+    if request.headers.get("content-type", "").startswith("application/x-www-form-urlencoded"):
+        body = await request.body()
+        return dict(parse_qsl(body.decode("utf-8"), keep_blank_values=True))
+    
+    return await request.form()
+
 
 @router.post("/webhook")
 async def voice_webhook(request: Request):
@@ -23,7 +86,7 @@ async def voice_webhook(request: Request):
     - Handle function calls during the conversation
     """
     try:
-        form_data = await request.form()
+        form_data = await _read_webhook_fields(request)
         
         call_sid = str(form_data.get("CallSid", ""))
         from_number = str(form_data.get("From", ""))
@@ -32,36 +95,19 @@ async def voice_webhook(request: Request):
         
         logger.info(f"Incoming call: SID={call_sid}, From={from_number}, To={to_number}, Status={call_status}")
         
-        facility = facility_service.get_facility_by_phone(to_number)
+        facility = _lookup_facility(to_number)
         
         if not facility:
             logger.warning(f"No facility found for phone number: {to_number}")
-            twiml = """<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Say>We're sorry, this facility is not configured. Please try again later.</Say>
-    <Hangup/>
-</Response>"""
-            return Response(content=twiml, media_type="application/xml")
+            return Response(content=NOT_CONFIGURED_TWIML, media_type="application/xml")
         
         logger.info(f"Call routed to facility: {facility.facility_name} ({facility.facility_id})")
         
-        twiml = f"""<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Say>Welcome to {facility.facility_name}. Please hold while we connect you to our AI assistant.</Say>
-    <Pause length="1"/>
-    <Say>This is a demo webhook. In production, this would connect to the OpenAI Realtime API via WebSocket.</Say>
-</Response>"""
-        
-        return Response(content=twiml, media_type="application/xml")
+        return Response(content=_get_welcome_twiml(facility), media_type="application/xml")
         
     except Exception as e:
         logger.error(f"Error in voice webhook: {e}")
-        twiml = """<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Say>We're sorry, an error occurred. Please try again later.</Say>
-    <Hangup/>
-</Response>"""
-        return Response(content=twiml, media_type="application/xml")
+        return Response(content=ERROR_TWIML, media_type="application/xml")
 
 
 @router.get("/webhook")
@@ -1,6 +1,15 @@
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
-from datetime import datetime
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import Optional, Dict, Any, NamedTuple
+from datetime import datetime, timezone
+from utils.slot_utils import SlotValidator, make_slot_validator
+from utils.time_utils import time_to_minutes
+
+
+class BookingRules(NamedTuple):
+    """Typed view of a facility's booking_rules"""
+    minimum_duration: int = 60
+    duration_multiples: int = 60
+    fixed_slots: bool = True
 
 
 class Facility(BaseModel):
@@ -15,6 +24,43 @@ class Facility(BaseModel):
     pricing: Dict[str, int]
     rentals: Dict[str, int]
     coaching: Dict[str, Any]
+    
+    # Derived once per instance so request validation is integer-only
+    _open_minutes: int = PrivateAttr()
+    _close_minutes: int = PrivateAttr()
+    _rules: BookingRules = PrivateAttr()
+    _slot_validator: SlotValidator = PrivateAttr()
+    
+    def model_post_init(self, __context: Any) -> None:
+        """Parse operating hours and booking rules"""
+        self._open_minutes = time_to_minutes(self.open_time)
+        self._close_minutes = time_to_minutes(self.close_time)
+        self._rules = BookingRules(
+            minimum_duration=int(self.booking_rules.get("minimum_duration", 60)),
+            duration_multiples=int(self.booking_rules.get("duration_multiples", 60)),
+            fixed_slots=bool(self.booking_rules.get("fixed_slots", True))
+        )
+        self._slot_validator = make_slot_validator(self._rules)
+    
+    @property
+    def open_minutes(self) -> int:
+        """Opening time as minutes since midnight"""
+        return self._open_minutes
+    
+    @property
+    def close_minutes(self) -> int:
+        """Closing time as minutes since midnight"""
+        return self._close_minutes
+    
+    @property
+    def rules(self) -> BookingRules:
+        """Parsed booking rules"""
+        return self._rules
+    
+    @property
+    def slot_validator(self) -> SlotValidator:
+        """Slot validator specialized to this facility's booking rules"""
+        return self._slot_validator
 
 
 class WebhookRequest(BaseModel):
@@ -31,4 +77,4 @@ class SessionData(BaseModel):
     session_id: str
     facility_id: str
     caller_number: Optional[str] = None
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import date, time
+import orjson
 
 
 class CheckAvailabilityRequest(BaseModel):
@@ -20,6 +21,7 @@ class CheckAvailabilityResponse(BaseModel):
     reason_if_not_available: Optional[str] = None
     data: Optional[dict] = None
     error: Optional[str] = None
+    availability_token: Optional[str] = None
 
 
 class CreateBookingRequest(BaseModel):
@@ -31,6 +33,7 @@ class CreateBookingRequest(BaseModel):
     name: str = Field(..., description="Customer name")
     phone_number: str = Field(..., description="Customer phone number")
     court_numbers: List[int] = Field(..., description="List of court numbers to book")
+    availability_token: Optional[str] = Field(None, description="Token returned by check_availability for this slot")
 
 
 class CreateBookingResponse(BaseModel):
@@ -46,7 +49,7 @@ FUNCTION_DEFINITIONS = [
     {
         "type": "function",
         "name": "check_availability",
-        "description": "Check availability of courts at a specific facility for a given date and time slot. Returns list of available courts.",
+        "description": "Check availability of courts at a specific facility for a given date and time slot. Returns list of available courts and an availability_token to pass to create_booking.",
         "parameters": {
             "type": "object",
             "properties": {
@@ -109,9 +112,17 @@ FUNCTION_DEFINITIONS = [
                     "type": "array",
                     "items": {"type": "integer"},
                     "description": "List of court numbers to book (e.g., [1, 2])"
+                },
+                "availability_token": {
+                    "type": "string",
+                    "description": "availability_token from the check_availability result for the same slot, if available"
                 }
             },
             "required": ["facility_id", "date", "start_time", "duration_minutes", "name", "phone_number", "court_numbers"]
         }
     }
 ]
+
+# FUNCTION_DEFINITIONS never changes at runtime; this immutable bytes
+# singleton is what gets sent to clients, so it is serialized only once
+FUNCTION_DEFINITIONS_BYTES = orjson.dumps(FUNCTION_DEFINITIONS)
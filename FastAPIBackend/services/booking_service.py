@@ -2,8 +2,9 @@ from typing import Dict, List
 from datetime import datetime
 from services.calendar_service import calendar_service
 from services.facility_service import facility_service
-from utils.time_utils import combine_datetime, get_end_datetime, calculate_end_time, is_within_operating_hours
-from utils.slot_utils import validate_booking_slot, validate_court_numbers
+from utils.time_utils import combine_datetime, get_end_datetime, calculate_end_time, is_within_operating_hours, time_to_minutes
+from utils.slot_utils import courts_to_mask, mask_to_courts, validate_court_numbers
+from utils.token_utils import create_availability_token, verify_availability_token
 from schemas.function_call_schemas import (
     CheckAvailabilityRequest,
     CheckAvailabilityResponse,
@@ -12,10 +13,17 @@ from schemas.function_call_schemas import (
 )
 
 
+def _unavailable_error(courts: List[int]) -> str:
+    """Error message for courts that are already booked"""
+    if len(courts) == 1:
+        return f"Court {courts[0]} is not available at the requested time"
+    return f"Courts {', '.join(map(str, courts))} are not available at the requested time"
+
+
 class BookingService:
     """Service for handling booking operations"""
     
-    def check_availability(self, request: CheckAvailabilityRequest) -> CheckAvailabilityResponse:
+    async def check_availability(self, request: CheckAvailabilityRequest) -> CheckAvailabilityResponse:
         """
         Check availability of courts for a specific time slot
         
@@ -34,11 +42,7 @@ class BookingService:
                     error=f"Facility not found: {request.facility_id}"
                 )
             
-            is_valid_slot, slot_error = validate_booking_slot(
-                request.start_time,
-                request.duration_minutes,
-                facility.booking_rules
-            )
+            is_valid_slot, slot_error = facility.slot_validator(request.start_time, request.duration_minutes)
             if not is_valid_slot:
                 return CheckAvailabilityResponse(
                     success=False,
@@ -46,15 +50,15 @@ class BookingService:
                     reason_if_not_available=slot_error
                 )
             
-            end_time = calculate_end_time(request.start_time, request.duration_minutes)
+            start_minutes = time_to_minutes(request.start_time)
             is_in_hours, hours_error = is_within_operating_hours(
-                request.start_time,
-                end_time,
-                facility.open_time,
-                facility.close_time
+                start_minutes,
+                start_minutes + request.duration_minutes,
+                facility.open_minutes,
+                facility.close_minutes
             )
             if not is_in_hours:
-                return CheckAvailabilityResponse(
+                return CheckAvailabilityResponse.model_construct(
                     success=False,
                     available=False,
                     reason_if_not_available=hours_error
@@ -63,15 +67,24 @@ class BookingService:
             start_dt = combine_datetime(request.date, request.start_time)
             end_dt = get_end_datetime(start_dt, request.duration_minutes)
             
-            available_courts = calendar_service.get_available_courts(
+            available_courts = await calendar_service.get_available_courts(
                 facility.facility_id,
                 facility.number_of_courts,
                 start_dt,
                 end_dt
             )
             
+            availability_token = create_availability_token(
+                facility.facility_id,
+                request.date,
+                request.start_time,
+                request.duration_minutes,
+                available_courts
+            )
+            
+            # Success responses carry only server-computed values, so skip validation
             if len(available_courts) < request.number_of_courts:
-                return CheckAvailabilityResponse(
+                return CheckAvailabilityResponse.model_construct(
                     success=True,
                     available=False,
                     free_courts=available_courts,
@@ -79,10 +92,11 @@ class BookingService:
                     data={
                         "available_courts": available_courts,
                         "requested_courts": request.number_of_courts
-                    }
+                    },
+                    availability_token=availability_token
                 )
             
-            return CheckAvailabilityResponse(
+            return CheckAvailabilityResponse.model_construct(
                 success=True,
                 available=True,
                 free_courts=available_courts,
@@ -92,7 +106,8 @@ class BookingService:
                     "date": request.date,
                     "start_time": request.start_time,
                     "duration_minutes": request.duration_minutes
-                }
+                },
+                availability_token=availability_token
             )
             
         except Exception as e:
@@ -102,7 +117,7 @@ class BookingService:
                 error=f"Error checking availability: {str(e)}"
             )
     
-    def create_booking(self, request: CreateBookingRequest) -> CreateBookingResponse:
+    async def create_booking(self, request: CreateBookingRequest) -> CreateBookingResponse:
         """
         Create a booking for specific courts
         
@@ -114,7 +129,7 @@ class BookingService:
         """
         try:
             if not calendar_service.service:
-                return CreateBookingResponse(
+                return CreateBookingResponse.model_construct(
                     success=False,
                     error="Calendar service is not initialized. Please configure Google Calendar integration."
                 )
@@ -126,11 +141,7 @@ class BookingService:
                     error=f"Facility not found: {request.facility_id}"
                 )
             
-            is_valid_slot, slot_error = validate_booking_slot(
-                request.start_time,
-                request.duration_minutes,
-                facility.booking_rules
-            )
+            is_valid_slot, slot_error = facility.slot_validator(request.start_time, request.duration_minutes)
             if not is_valid_slot:
                 return CreateBookingResponse(
                     success=False,
@@ -147,39 +158,55 @@ class BookingService:
                     error=f"Invalid court numbers: {courts_error}"
                 )
             
-            end_time = calculate_end_time(request.start_time, request.duration_minutes)
+            start_minutes = time_to_minutes(request.start_time)
             is_in_hours, hours_error = is_within_operating_hours(
-                request.start_time,
-                end_time,
-                facility.open_time,
-                facility.close_time
+                start_minutes,
+                start_minutes + request.duration_minutes,
+                facility.open_minutes,
+                facility.close_minutes
             )
             if not is_in_hours:
-                return CreateBookingResponse(
+                return CreateBookingResponse.model_construct(
                     success=False,
                     error=f"Outside operating hours: {hours_error}"
                 )
             
+            end_time = calculate_end_time(request.start_time, request.duration_minutes)
             start_dt = combine_datetime(request.date, request.start_time)
             end_dt = get_end_datetime(start_dt, request.duration_minutes)
             
-            available_courts = calendar_service.get_available_courts(
-                facility.facility_id,
-                facility.number_of_courts,
-                start_dt,
-                end_dt
-            )
+            # A fresh token from check_availability spares a second calendar lookup
+            free_courts = None
+            if request.availability_token:
+                free_courts = verify_availability_token(
+                    request.availability_token,
+                    facility.facility_id,
+                    request.date,
+                    request.start_time,
+                    request.duration_minutes,
+                    not_before=calendar_service.last_modified(facility.facility_id, start_dt)
+                )
+            if free_courts is not None:
+                free_mask = courts_to_mask(free_courts)
+            else:
+                # The last check before inserting reads the calendar, not the cache
+                free_mask = await calendar_service.get_free_courts_mask(
+                    facility.facility_id,
+                    facility.number_of_courts,
+                    start_dt,
+                    end_dt,
+                    use_cache=False
+                )
             
-            for court_num in request.court_numbers:
-                if court_num not in available_courts:
-                    return CreateBookingResponse(
-                        success=False,
-                        error=f"Court {court_num} is not available at the requested time"
-                    )
+            unavailable_courts = mask_to_courts(courts_to_mask(request.court_numbers) & ~free_mask)
+            if unavailable_courts:
+                return CreateBookingResponse(
+                    success=False,
+                    error=_unavailable_error(unavailable_courts)
+                )
             
-            booking_ids = []
-            for court_num in request.court_numbers:
-                event_id = calendar_service.create_booking_event(
+            events = [
+                calendar_service.build_booking_event(
                     facility_name=facility.facility_name,
                     facility_id=facility.facility_id,
                     court_number=court_num,
@@ -191,16 +218,37 @@ class BookingService:
                     start_time=request.start_time,
                     duration_minutes=request.duration_minutes
                 )
-                if event_id:
-                    booking_ids.append(event_id)
+                for court_num in request.court_numbers
+            ]
+            booking_ids = await calendar_service.create_booking_events_batch(
+                facility.facility_id,
+                start_dt,
+                events
+            )
             
             if not booking_ids:
-                return CreateBookingResponse(
+                return CreateBookingResponse.model_construct(
                     success=False,
                     error="Failed to create calendar events"
                 )
             
-            return CreateBookingResponse(
+            # Overlapping inserts are not rejected by Google, so re-check the slot live
+            conflicting_courts, orphaned_ids = await calendar_service.reconcile_booking(
+                facility.facility_id,
+                start_dt,
+                end_dt,
+                booking_ids
+            )
+            if conflicting_courts:
+                error = _unavailable_error(conflicting_courts)
+                if orphaned_ids:
+                    error += f". Calendar events {', '.join(orphaned_ids)} from this attempt could not be removed"
+                return CreateBookingResponse.model_construct(
+                    success=False,
+                    error=error
+                )
+            
+            return CreateBookingResponse.model_construct(
                 success=True,
                 booking_id=",".join(booking_ids),
                 message=f"Booking confirmed for {request.name}! Courts {', '.join(map(str, request.court_numbers))} on {request.date} at {request.start_time} for {request.duration_minutes} minutes.",
@@ -1,43 +1,274 @@
-from datetime import datetime
-from typing import List, Dict, Optional
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Set, Tuple
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp, Request
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+import asyncio
+import httplib2
 import os
+import re
+import threading
+import time
+
+from utils.slot_utils import mask_to_courts
+
+
+# Extracts the court number from event titles like "Court 3 Booking - Name"
+_COURT_RE = re.compile(r"\bCourt (\d+)\b")
+
+# Seconds a facility-day's busy intervals are served from memory
+BUSY_CACHE_TTL = 30
+
+# Expired entries are pruned once the cache grows past this size
+BUSY_CACHE_MAX_ENTRIES = 256
+
+# (start, end, court_number) of one booked event
+BusyInterval = Tuple[datetime, datetime, int]
+
+
+def _booked_court(event: Dict, facility_id: str) -> Optional[int]:
+    """Get the court an event books at the facility, or None if it is unrelated"""
+    tags = event.get('extendedProperties', {}).get('private', {})
+    if 'court' in tags:
+        if tags.get('facility_id') != facility_id or not tags['court'].isdigit():
+            return None
+        return int(tags['court'])
+    
+    # Events created before bookings were tagged with extended properties
+    event_summary = event.get('summary', '')
+    if facility_id not in event_summary and facility_id not in event.get('description', ''):
+        return None
+    
+    match = _COURT_RE.search(event_summary)
+    return int(match.group(1)) if match else None
 
 
 class CalendarService:
-    """Service for Google Calendar operations"""
+    """
+    Service for Google Calendar operations
+    
+    Public calendar operations are coroutines: the blocking googleapiclient
+    requests run in worker threads so the event loop keeps serving other
+    calls while a Google round-trip is in flight.
+    """
     
     def __init__(self):
         self.calendar_id = os.getenv("GOOGLE_CALENDAR_ID", "primary")
-        self.service = None
+        self._service = None
+        self._creds: Optional[Credentials] = None
+        # httplib2.Http is not thread-safe, so each worker thread gets its own
+        self._thread_local = threading.local()
+        # (facility_id, YYYY-MM-DD) -> (fetched_at, busy intervals for that day)
+        self._busy_cache: Dict[Tuple[str, str], Tuple[float, List[BusyInterval]]] = {}
+        # (facility_id, YYYY-MM-DD) -> invalidation count, so a fetch that overlaps
+        # an invalidation does not write its stale result back into the cache
+        self._busy_generation: Dict[Tuple[str, str], int] = {}
+        # (facility_id, YYYY-MM-DD) -> Unix time this process last changed its bookings
+        self._modified_at: Dict[Tuple[str, str], float] = {}
         self._initialize_service()
     
     def _initialize_service(self):
-        """Initialize Google Calendar service using Replit integration"""
+        """Load Google Calendar credentials once and build the API client at startup"""
         try:
             creds = None
             
             if os.path.exists("token.json"):
                 creds = Credentials.from_authorized_user_file("token.json")
             
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request(httplib2.Http()))
+            
             if not creds or not creds.valid:
                 print("⚠️  Google Calendar credentials not found or invalid")
                 print("   Using Replit Google Calendar integration...")
                 print("   Calendar operations will simulate until credentials are available")
-                self.service = None
                 return
             
-            self.service = build("calendar", "v3", credentials=creds)
+            self._creds = creds
+            # Built here, not on first request, so the discovery-document
+            # parse never blocks the event loop mid-call
+            self._get_service()
             print("✓ Google Calendar service initialized successfully")
             
         except Exception as e:
             print(f"⚠️  Error initializing Google Calendar: {e}")
             print("   Make sure Google Calendar integration is properly configured")
-            self.service = None
+            self._creds = None
+    
+    def _get_service(self):
+        """
+        Get the Calendar API client, building it if not built yet
+        
+        The client is built from the bundled discovery document, so no
+        discovery fetch goes over the network. Token refresh after startup
+        is handled by each thread's AuthorizedHttp before it sends a request.
+        """
+        if self._service is None and self._creds is not None:
+            self._service = build(
+                "calendar",
+                "v3",
+                credentials=self._creds,
+                cache_discovery=False,
+                static_discovery=True
+            )
+        return self._service
+    
+    @property
+    def service(self):
+        """Calendar API client built at startup, or None when credentials are unavailable"""
+        return self._service
+    
+    def _execute(self, request):
+        """Execute a Google API (or batch) request on this thread's HTTP transport"""
+        http = getattr(self._thread_local, "http", None)
+        if http is None:
+            http = AuthorizedHttp(self._creds, http=httplib2.Http())
+            self._thread_local.http = http
+        return request.execute(http=http)
+    
+    def _list_events(self, start_dt: datetime, end_dt: datetime) -> List[Dict]:
+        """List all calendar events overlapping the given time range"""
+        events = []
+        page_token = None
+        while True:
+            events_result = self._execute(self.service.events().list(
+                calendarId=self.calendar_id,
+                timeMin=start_dt.isoformat(),
+                timeMax=end_dt.isoformat(),
+                singleEvents=True,
+                pageToken=page_token
+            ))
+            events.extend(events_result.get('items', []))
+            page_token = events_result.get('nextPageToken')
+            if not page_token:
+                return events
+    
+    def _fetch_busy_intervals(
+        self,
+        facility_id: str,
+        start_dt: datetime,
+        end_dt: datetime
+    ) -> List[BusyInterval]:
+        """
+        Fetch (start, end, court) for every facility booking overlapping the range
+        
+        Each returned event is inspected once (tags, else one _COURT_RE search),
+        so the cost is O(events) regardless of how many courts are asked about.
+        """
+        intervals = []
+        for event in self._list_events(start_dt, end_dt):
+            court_number = _booked_court(event, facility_id)
+            if court_number is None:
+                continue
+            
+            event_start = event.get('start', {}).get('dateTime')
+            event_end = event.get('end', {}).get('dateTime')
+            if event_start and event_end:
+                interval_start = datetime.fromisoformat(event_start)
+                interval_end = datetime.fromisoformat(event_end)
+            else:
+                # All-day event: it blocks the whole queried range
+                interval_start, interval_end = start_dt, end_dt
+            
+            intervals.append((interval_start, interval_end, court_number))
+        
+        return intervals
     
-    def check_court_availability(
+    def _get_cached_day_busy(self, facility_id: str, day_start: datetime) -> Optional[List[BusyInterval]]:
+        """Get a facility-day's busy intervals if fetched within BUSY_CACHE_TTL seconds"""
+        cached = self._busy_cache.get((facility_id, day_start.date().isoformat()))
+        if cached and time.monotonic() - cached[0] < BUSY_CACHE_TTL:
+            return cached[1]
+        return None
+    
+    def _store_day_busy(
+        self,
+        facility_id: str,
+        day_start: datetime,
+        intervals: List[BusyInterval],
+        generation: int
+    ) -> None:
+        """
+        Cache a facility-day's busy intervals, pruning expired entries when full
+        
+        The result is dropped if the facility-day was invalidated after the
+        fetch started (its generation moved on), since it may predate a booking.
+        """
+        key = (facility_id, day_start.date().isoformat())
+        if self._busy_generation.get(key, 0) != generation:
+            return
+        
+        now = time.monotonic()
+        if len(self._busy_cache) >= BUSY_CACHE_MAX_ENTRIES:
+            self._busy_cache = {
+                k: v for k, v in self._busy_cache.items()
+                if now - v[0] < BUSY_CACHE_TTL
+            }
+        self._busy_cache[key] = (now, intervals)
+    
+    def invalidate_busy_cache(self, facility_id: str, start_dt: datetime) -> None:
+        """Drop the cached busy intervals for the facility-day containing start_dt"""
+        key = (facility_id, start_dt.date().isoformat())
+        self._busy_cache.pop(key, None)
+        self._busy_generation[key] = self._busy_generation.get(key, 0) + 1
+        self._modified_at[key] = time.time()
+    
+    def last_modified(self, facility_id: str, start_dt: datetime) -> float:
+        """Unix time this process last changed bookings on the facility-day (0.0 if never)"""
+        return self._modified_at.get((facility_id, start_dt.date().isoformat()), 0.0)
+    
+    async def get_busy_courts(
+        self,
+        facility_id: str,
+        start_dt: datetime,
+        end_dt: datetime,
+        use_cache: bool = True
+    ) -> Set[int]:
+        """
+        Get the set of courts booked at any point in the given time slot
+        
+        Busy intervals are loaded once per facility and day and reused for
+        BUSY_CACHE_TTL seconds, so repeated checks during a conversation are
+        answered from memory. The cache is per process and does not see
+        bookings made elsewhere, so the check guarding an insert must pass
+        use_cache=False to read the slot live.
+        
+        Args:
+            facility_id: Facility identifier
+            start_dt: Start datetime
+            end_dt: End datetime
+            use_cache: Serve from the facility-day cache (False fetches the slot live)
+        
+        Returns:
+            Set of booked court numbers (empty if the calendar is unavailable)
+        """
+        if not self.service:
+            print("⚠️  Calendar service not initialized - availability check skipped")
+            return set()
+        
+        day_start = start_dt.replace(hour=0, minute=0, second=0, microsecond=0)
+        day_end = day_start + timedelta(days=1)
+        
+        try:
+            if use_cache and end_dt <= day_end:
+                intervals = self._get_cached_day_busy(facility_id, day_start)
+                if intervals is None:
+                    generation = self._busy_generation.get((facility_id, day_start.date().isoformat()), 0)
+                    intervals = await asyncio.to_thread(self._fetch_busy_intervals, facility_id, day_start, day_end)
+                    self._store_day_busy(facility_id, day_start, intervals, generation)
+            else:
+                intervals = await asyncio.to_thread(self._fetch_busy_intervals, facility_id, start_dt, end_dt)
+        except HttpError as e:
+            print(f"⚠️  Error checking calendar: {e}")
+            return set()
+        
+        return {
+            court for busy_start, busy_end, court in intervals
+            if busy_start < end_dt and busy_end > start_dt
+        }
+    
+    async def check_court_availability(
         self, 
         court_number: int, 
         start_dt: datetime, 
@@ -61,36 +292,36 @@ class CalendarService:
             testing and development. In production, ensure calendar is properly
             configured before accepting bookings.
         """
-        if not self.service:
-            print(f"⚠️  Calendar service not initialized - availability check skipped (court {court_number})")
-            return True
+        return court_number not in await self.get_busy_courts(facility_id, start_dt, end_dt)
+    
+    async def get_free_courts_mask(
+        self,
+        facility_id: str,
+        total_courts: int,
+        start_dt: datetime,
+        end_dt: datetime,
+        use_cache: bool = True
+    ) -> int:
+        """
+        Get the free courts for the given time slot as a bitmask
         
-        try:
-            events_result = self.service.events().list(
-                calendarId=self.calendar_id,
-                timeMin=start_dt.isoformat(),
-                timeMax=end_dt.isoformat(),
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-            
-            events = events_result.get('items', [])
-            
-            for event in events:
-                event_summary = event.get('summary', '')
-                event_description = event.get('description', '')
-                
-                if f"Court {court_number}" in event_summary:
-                    if facility_id in event_description or facility_id in event_summary:
-                        return False
-            
-            return True
-            
-        except HttpError as e:
-            print(f"⚠️  Error checking calendar: {e}")
-            return True
+        Args:
+            facility_id: Facility identifier
+            total_courts: Total number of courts at facility
+            start_dt: Start datetime
+            end_dt: End datetime
+            use_cache: Serve from the facility-day cache (False fetches the slot live)
+        
+        Returns:
+            Bitmask with bit N-1 set when court N is free
+        """
+        busy_mask = 0
+        for court in await self.get_busy_courts(facility_id, start_dt, end_dt, use_cache):
+            if 0 < court <= total_courts:
+                busy_mask |= 1 << (court - 1)
+        return ((1 << total_courts) - 1) & ~busy_mask
     
-    def get_available_courts(
+    async def get_available_courts(
         self,
         facility_id: str,
         total_courts: int,
@@ -109,15 +340,76 @@ class CalendarService:
         Returns:
             List of available court numbers
         """
-        available_courts = []
+        return mask_to_courts(await self.get_free_courts_mask(facility_id, total_courts, start_dt, end_dt))
+    
+    def build_booking_event(
+        self,
+        facility_name: str,
+        facility_id: str,
+        court_number: int,
+        customer_name: str,
+        customer_phone: str,
+        start_dt: datetime,
+        end_dt: datetime,
+        date_str: str,
+        start_time: str,
+        duration_minutes: int
+    ) -> Dict:
+        """
+        Build the Google Calendar event body for a single court booking
         
-        for court_num in range(1, total_courts + 1):
-            if self.check_court_availability(court_num, start_dt, end_dt, facility_id):
-                available_courts.append(court_num)
+        Args:
+            facility_name: Name of the facility
+            facility_id: Facility identifier
+            court_number: Court number
+            customer_name: Customer name
+            customer_phone: Customer phone
+            start_dt: Start datetime
+            end_dt: End datetime
+            date_str: Date string
+            start_time: Start time string
+            duration_minutes: Duration in minutes
+        
+        Returns:
+            Event body for events().insert
+        """
+        event_title = f"Court {court_number} Booking - {customer_name}"
         
-        return available_courts
+        event_description = f"""Customer Name: {customer_name}
+Phone: {customer_phone}
+Facility: {facility_name} ({facility_id})
+Court Number: {court_number}
+Date: {date_str}
+Start Time: {start_time}
+End Time: {end_dt.strftime('%H:%M')}
+Duration: {duration_minutes} minutes"""
+        
+        return {
+            'summary': event_title,
+            'description': event_description,
+            'start': {
+                'dateTime': start_dt.isoformat(),
+                'timeZone': str(start_dt.tzinfo),
+            },
+            'end': {
+                'dateTime': end_dt.isoformat(),
+                'timeZone': str(end_dt.tzinfo),
+            },
+            'reminders': {
+                'useDefault': False,
+                'overrides': [
+                    {'method': 'popup', 'minutes': 60},
+                ],
+            },
+            'extendedProperties': {
+                'private': {
+                    'court': str(court_number),
+                    'facility_id': facility_id,
+                },
+            },
+        }
     
-    def create_booking_event(
+    async def create_booking_event(
         self,
         facility_name: str,
         facility_id: str,
@@ -153,48 +445,155 @@ class CalendarService:
             return None
         
         try:
-            event_title = f"Court {court_number} Booking - {customer_name}"
-            
-            event_description = f"""Customer Name: {customer_name}
-Phone: {customer_phone}
-Facility: {facility_name} ({facility_id})
-Court Number: {court_number}
-Date: {date_str}
-Start Time: {start_time}
-End Time: {end_dt.strftime('%H:%M')}
-Duration: {duration_minutes} minutes"""
-            
-            event = {
-                'summary': event_title,
-                'description': event_description,
-                'start': {
-                    'dateTime': start_dt.isoformat(),
-                    'timeZone': str(start_dt.tzinfo),
-                },
-                'end': {
-                    'dateTime': end_dt.isoformat(),
-                    'timeZone': str(end_dt.tzinfo),
-                },
-                'reminders': {
-                    'useDefault': False,
-                    'overrides': [
-                        {'method': 'popup', 'minutes': 60},
-                    ],
-                },
-            }
+            event = self.build_booking_event(
+                facility_name, facility_id, court_number, customer_name, customer_phone,
+                start_dt, end_dt, date_str, start_time, duration_minutes
+            )
             
-            created_event = self.service.events().insert(
+            created_event = await asyncio.to_thread(self._execute, self.service.events().insert(
                 calendarId=self.calendar_id,
                 body=event
-            ).execute()
+            ))
             
-            print(f"✓ Created booking: {event_title} (ID: {created_event['id']})")
+            self.invalidate_busy_cache(facility_id, start_dt)
+            print(f"✓ Created booking: {event['summary']} (ID: {created_event['id']})")
             return created_event['id']
             
         except HttpError as e:
             print(f"⚠️  Error creating calendar event: {e}")
             return None
-
+    
+    async def create_booking_events_batch(
+        self,
+        facility_id: str,
+        start_dt: datetime,
+        events: List[Dict]
+    ) -> List[str]:
+        """
+        Insert several booking events in one batch HTTP request
+        
+        Args:
+            facility_id: Facility identifier (for cache invalidation)
+            start_dt: Start datetime shared by the events
+            events: Event bodies from build_booking_event
+        
+        Returns:
+            IDs of the events that were created, in request order
+        """
+        if not self.service:
+            print("✗ Calendar service not initialized - cannot create booking")
+            return []
+        
+        created_ids: Dict[str, str] = {}
+        
+        def on_insert(request_id, response, exception):
+            if exception is not None:
+                print(f"⚠️  Error creating calendar event: {exception}")
+                return
+            created_ids[request_id] = response['id']
+            print(f"✓ Created booking: {response.get('summary')} (ID: {response['id']})")
+        
+        batch = self.service.new_batch_http_request(callback=on_insert)
+        for index, event in enumerate(events):
+            batch.add(
+                self.service.events().insert(calendarId=self.calendar_id, body=event),
+                request_id=str(index)
+            )
+        
+        try:
+            await asyncio.to_thread(self._execute, batch)
+        except HttpError as e:
+            print(f"⚠️  Error creating calendar events: {e}")
+        
+        self.invalidate_busy_cache(facility_id, start_dt)
+        return [created_ids[str(i)] for i in range(len(events)) if str(i) in created_ids]
+    
+    def _find_conflicts(
+        self,
+        facility_id: str,
+        start_dt: datetime,
+        end_dt: datetime,
+        event_ids: Set[str]
+    ) -> List[int]:
+        """Courts where one of event_ids overlaps a booking created before it"""
+        ours: Dict[int, Tuple[str, str]] = {}
+        others: List[Tuple[int, Tuple[str, str]]] = []
+        for event in self._list_events(start_dt, end_dt):
+            court_number = _booked_court(event, facility_id)
+            if court_number is None:
+                continue
+            
+            # Creation order decides which of two colliding bookings stands
+            rank = (event.get('created', ''), event.get('id', ''))
+            if event.get('id') in event_ids:
+                ours[court_number] = rank
+            else:
+                others.append((court_number, rank))
+        
+        return sorted({court for court, rank in others if court in ours and rank < ours[court]})
+    
+    def _delete_events(self, event_ids: List[str]) -> List[str]:
+        """Delete events in one batch HTTP request, returning the IDs that could not be deleted"""
+        failed_ids: List[str] = []
+        
+        def on_delete(request_id, response, exception):
+            if exception is not None:
+                print(f"⚠️  Error deleting calendar event {request_id}: {exception}")
+                failed_ids.append(request_id)
+        
+        batch = self.service.new_batch_http_request(callback=on_delete)
+        for event_id in event_ids:
+            batch.add(
+                self.service.events().delete(calendarId=self.calendar_id, eventId=event_id),
+                request_id=event_id
+            )
+        
+        try:
+            self._execute(batch)
+        except HttpError as e:
+            print(f"⚠️  Error deleting calendar events: {e}")
+            return list(event_ids)
+        return failed_ids
+    
+    async def reconcile_booking(
+        self,
+        facility_id: str,
+        start_dt: datetime,
+        end_dt: datetime,
+        event_ids: List[str]
+    ) -> Tuple[List[int], List[str]]:
+        """
+        Re-read the slot after an insert and roll the booking back if it collided
+        
+        Google Calendar accepts overlapping events, so two callers (or a stale
+        availability check) can book the same court. The booking whose event
+        was created later loses: all of its events are deleted.
+        
+        Args:
+            facility_id: Facility identifier
+            start_dt: Start datetime
+            end_dt: End datetime
+            event_ids: IDs from create_booking_events_batch
+        
+        Returns:
+            Tuple of (courts that were already booked, IDs of this booking's
+            events the rollback failed to delete); both empty if the booking stands
+        """
+        try:
+            conflicts = await asyncio.to_thread(self._find_conflicts, facility_id, start_dt, end_dt, set(event_ids))
+        except HttpError as e:
+            print(f"⚠️  Error reconciling booking: {e}")
+            return [], []
+        
+        if not conflicts:
+            return [], []
+        
+        orphaned_ids = await asyncio.to_thread(self._delete_events, event_ids)
+        self.invalidate_busy_cache(facility_id, start_dt)
+        print(f"✗ Rolled back booking {', '.join(event_ids)}: courts {conflicts} already booked")
+        if orphaned_ids:
+            print(f"⚠️  Rollback left orphaned calendar events (delete manually): {', '.join(orphaned_ids)}")
+        return conflicts, orphaned_ids
 
 # Global calendar service instance
 calendar_service = CalendarService()
@@ -1,7 +1,8 @@
-import json
+import orjson
 from typing import Dict, Optional
 from pathlib import Path
 from schemas.booking_schemas import Facility
+from utils.phone_utils import normalize_phone_number
 
 
 class FacilityService:
@@ -10,7 +11,12 @@ class FacilityService:
     def __init__(self, config_path: str = "config/facilities.json"):
         self.config_path = config_path
         self.facilities: Dict[str, Facility] = {}
-        self.phone_to_facility: Dict[str, str] = {}
+        # Normalized (digits-only) phone number -> Facility, for O(1) call routing
+        self.by_phone: Dict[str, Facility] = {}
+        # Facility ID -> system prompt, built once per load
+        self.system_prompts: Dict[str, str] = {}
+        # Incremented on every load so callers can invalidate derived caches
+        self.version = 0
     
     def load_facilities(self) -> None:
         """Load facility configurations from JSON file"""
@@ -19,13 +25,19 @@ class FacilityService:
         if not config_file.exists():
             raise FileNotFoundError(f"Facilities configuration file not found: {self.config_path}")
         
-        with open(config_file, "r") as f:
-            data = json.load(f)
+        data = orjson.loads(config_file.read_bytes())
         
+        by_phone = {}
+        system_prompts = {}
         for facility_id, facility_data in data.items():
             facility = Facility(**facility_data)
             self.facilities[facility_id] = facility
-            self.phone_to_facility[facility_data["phone_number"]] = facility_id
+            by_phone[normalize_phone_number(facility.phone_number)] = facility
+            system_prompts[facility.facility_id] = self._build_prompt(facility)
+        
+        self.by_phone = by_phone
+        self.system_prompts = system_prompts
+        self.version += 1
         
         print(f"✓ Loaded {len(self.facilities)} facilities:")
         for fid, facility in self.facilities.items():
@@ -36,17 +48,19 @@ class FacilityService:
         return self.facilities.get(facility_id)
     
     def get_facility_by_phone(self, phone_number: str) -> Optional[Facility]:
-        """Get facility by phone number (called number)"""
-        facility_id = self.phone_to_facility.get(phone_number)
-        if facility_id:
-            return self.facilities.get(facility_id)
-        return None
+        """Get facility by phone number (called number), in any formatting"""
+        return self.by_phone.get(normalize_phone_number(phone_number))
     
     def get_all_facilities(self) -> Dict[str, Facility]:
         """Get all facilities"""
         return self.facilities
     
     def get_facility_system_prompt(self, facility: Facility) -> str:
+        """Get the system prompt for a facility (built once at load time)"""
+        prompt = self.system_prompts.get(facility.facility_id)
+        return prompt if prompt is not None else self._build_prompt(facility)
+    
+    def _build_prompt(self, facility: Facility) -> str:
         """Generate system prompt for a facility"""
         prompt = f"""You are an AI voice assistant for {facility.facility_name}, a sports facility booking system.
 
@@ -0,0 +1,20 @@
+import re
+
+
+_NON_DIGITS = re.compile(r"[^\d]")
+
+
+def normalize_phone_number(phone_number: str) -> str:
+    """
+    Normalize a phone number to its digits for lookups
+    
+    Strips "+", spaces, dashes and parentheses so that "+91 98765-43210"
+    and "+919876543210" resolve to the same key.
+    
+    Args:
+        phone_number: Phone number in any common display format
+    
+    Returns:
+        Digits-only phone number
+    """
+    return _NON_DIGITS.sub("", phone_number)
@@ -1,4 +1,15 @@
-from typing import Tuple
+from typing import TYPE_CHECKING, Callable, Iterable, List, Tuple
+from utils.time_utils import parse_time
+
+if TYPE_CHECKING:
+    # Only annotated here; a runtime import would cycle with schemas.booking_schemas
+    from schemas.booking_schemas import BookingRules
+
+
+# Every hourly start time, with and without a leading zero ("06:00", "6:00")
+_HOURLY_START_TIMES = frozenset(
+    [f"{hour:02d}:00" for hour in range(24)] + [f"{hour}:00" for hour in range(10)]
+)
 
 
 def validate_slot_alignment(start_time: str) -> Tuple[bool, str]:
@@ -13,16 +24,15 @@ def validate_slot_alignment(start_time: str) -> Tuple[bool, str]:
     Returns:
         Tuple of (is_valid, error_message)
     """
-    try:
-        hour, minute = start_time.split(":")
-        minute = int(minute)
-        
-        if minute != 0:
-            return False, f"Start time must align with hourly boundaries (e.g., 06:00, 14:00). Got {start_time}"
-        
+    if start_time in _HOURLY_START_TIMES:
         return True, ""
-    except (ValueError, AttributeError):
+    
+    try:
+        parse_time(start_time)
+    except (ValueError, TypeError):
         return False, f"Invalid time format: {start_time}. Expected HH:MM"
+    
+    return False, f"Start time must align with hourly boundaries (e.g., 06:00, 14:00). Got {start_time}"
 
 
 def validate_duration(duration_minutes: int, minimum_duration: int = 60, duration_multiples: int = 60) -> Tuple[bool, str]:
@@ -46,36 +56,42 @@ def validate_duration(duration_minutes: int, minimum_duration: int = 60, duratio
     return True, ""
 
 
-def validate_booking_slot(start_time: str, duration_minutes: int, booking_rules: dict) -> Tuple[bool, str]:
+SlotValidator = Callable[[str, int], Tuple[bool, str]]
+
+
+def make_slot_validator(rules: "BookingRules") -> SlotValidator:
     """
-    Validate complete booking slot against facility rules
+    Build a slot validator specialized to one facility's booking rules
+    
+    The rule values are bound into the closure once, so validating a
+    request is plain integer and set checks with no rule lookups.
     
     Args:
-        start_time: Start time in HH:MM format
-        duration_minutes: Duration in minutes
-        booking_rules: Facility booking rules dictionary
+        rules: Facility booking rules, parsed at load time
     
     Returns:
-        Tuple of (is_valid, error_message)
+        Function (start_time, duration_minutes) -> (is_valid, error_message)
     """
-    minimum_duration = booking_rules.get("minimum_duration", 60)
-    duration_multiples = booking_rules.get("duration_multiples", 60)
-    fixed_slots = booking_rules.get("fixed_slots", True)
-    
-    if fixed_slots:
-        is_aligned, align_msg = validate_slot_alignment(start_time)
-        if not is_aligned:
-            return False, align_msg
-    
-    is_valid_duration, duration_msg = validate_duration(
-        duration_minutes, 
-        minimum_duration, 
-        duration_multiples
-    )
-    if not is_valid_duration:
-        return False, duration_msg
+    minimum_duration, duration_multiples, fixed_slots = rules
     
-    return True, ""
+    # Valid requests pass on inlined integer and set checks; failures defer to
+    # validate_duration / validate_slot_alignment for their error messages
+    def validate_duration_only(start_time: str, duration_minutes: int) -> Tuple[bool, str]:
+        if duration_minutes < minimum_duration or duration_minutes % duration_multiples:
+            return validate_duration(duration_minutes, minimum_duration, duration_multiples)
+        return True, ""
+    
+    if not fixed_slots:
+        return validate_duration_only
+    
+    def validate_fixed_slot(start_time: str, duration_minutes: int) -> Tuple[bool, str]:
+        if duration_minutes < minimum_duration or duration_minutes % duration_multiples:
+            return validate_duration(duration_minutes, minimum_duration, duration_multiples)
+        if start_time not in _HOURLY_START_TIMES:
+            return validate_slot_alignment(start_time)
+        return True, ""
+    
+    return validate_fixed_slot
 
 
 def validate_court_numbers(court_numbers: list, number_of_courts: int) -> Tuple[bool, str]:
@@ -92,11 +108,45 @@ def validate_court_numbers(court_numbers: list, number_of_courts: int) -> Tuple[
     if not court_numbers:
         return False, "At least one court must be specified"
     
-    for court_num in court_numbers:
-        if court_num < 1 or court_num > number_of_courts:
-            return False, f"Invalid court number {court_num}. Facility has courts 1-{number_of_courts}"
+    if min(court_numbers) < 1 or max(court_numbers) > number_of_courts:
+        court_num = next(c for c in court_numbers if c < 1 or c > number_of_courts)
+        return False, f"Invalid court number {court_num}. Facility has courts 1-{number_of_courts}"
     
-    if len(court_numbers) != len(set(court_numbers)):
+    if len(set(court_numbers)) != len(court_numbers):
         return False, "Duplicate court numbers found in request"
     
     return True, ""
+
+
+def courts_to_mask(courts: Iterable[int]) -> int:
+    """
+    Pack court numbers into a bitmask (court N is bit N-1)
+    
+    Args:
+        courts: Court numbers, each 1 or greater
+    
+    Returns:
+        Bitmask with one bit set per court
+    """
+    mask = 0
+    for court in courts:
+        mask |= 1 << (court - 1)
+    return mask
+
+
+def mask_to_courts(mask: int) -> List[int]:
+    """
+    Unpack a court bitmask into ascending court numbers
+    
+    Args:
+        mask: Bitmask from courts_to_mask
+    
+    Returns:
+        List of court numbers whose bits are set
+    """
+    courts = []
+    while mask:
+        lowest_bit = mask & -mask
+        courts.append(lowest_bit.bit_length())
+        mask ^= lowest_bit
+    return courts
@@ -1,6 +1,12 @@
-from datetime import datetime, timedelta, time as dt_time
+from datetime import datetime, timedelta, time as dt_time, tzinfo
+from functools import lru_cache
 from typing import Tuple
-import pytz
+from zoneinfo import ZoneInfo
+
+
+def _is_short_number(value: str) -> bool:
+    """Check for a 1-2 digit number, matching strptime's %H/%M/%m/%d fields"""
+    return 0 < len(value) <= 2 and value.isdigit()
 
 
 def parse_time(time_str: str) -> dt_time:
@@ -14,8 +20,11 @@ def parse_time(time_str: str) -> dt_time:
         datetime.time object
     """
     try:
-        return datetime.strptime(time_str, "%H:%M").time()
-    except ValueError as e:
+        hour, sep, minute = time_str.partition(":")
+        if not (sep and _is_short_number(hour) and _is_short_number(minute)):
+            raise ValueError(time_str)
+        return dt_time(int(hour), int(minute))
+    except (ValueError, AttributeError) as e:
         raise ValueError(f"Invalid time format: {time_str}. Expected HH:MM format.") from e
 
 
@@ -30,11 +39,20 @@ def parse_date(date_str: str) -> datetime:
         datetime object
     """
     try:
-        return datetime.strptime(date_str, "%Y-%m-%d")
-    except ValueError as e:
+        year, month, day = date_str.split("-")
+        if not (len(year) == 4 and year.isdigit() and _is_short_number(month) and _is_short_number(day)):
+            raise ValueError(date_str)
+        return datetime(int(year), int(month), int(day))
+    except (ValueError, AttributeError) as e:
         raise ValueError(f"Invalid date format: {date_str}. Expected YYYY-MM-DD format.") from e
 
 
+@lru_cache(maxsize=8)
+def get_timezone(timezone_str: str) -> tzinfo:
+    """Get a (cached) timezone object by IANA name"""
+    return ZoneInfo(timezone_str)
+
+
 def combine_datetime(date_str: str, time_str: str, timezone_str: str = "Asia/Kolkata") -> datetime:
     """
     Combine date and time strings into a timezone-aware datetime object
@@ -50,10 +68,7 @@ def combine_datetime(date_str: str, time_str: str, timezone_str: str = "Asia/Kol
     date_obj = parse_date(date_str)
     time_obj = parse_time(time_str)
     
-    naive_dt = datetime.combine(date_obj.date(), time_obj)
-    
-    tz = pytz.timezone(timezone_str)
-    return tz.localize(naive_dt)
+    return datetime.combine(date_obj.date(), time_obj, tzinfo=get_timezone(timezone_str))
 
 
 def get_end_datetime(start_dt: datetime, duration_minutes: int) -> datetime:
@@ -83,34 +98,54 @@ def format_datetime_for_calendar(dt: datetime) -> str:
     return dt.isoformat()
 
 
-def is_within_operating_hours(start_time: str, end_time: str, open_time: str, close_time: str) -> Tuple[bool, str]:
+def time_to_minutes(time_str: str) -> int:
+    """
+    Convert a time string in HH:MM format to minutes since midnight
+    
+    Args:
+        time_str: Time in HH:MM format (e.g., "14:00")
+    
+    Returns:
+        Minutes since midnight
+    """
+    parsed = parse_time(time_str)
+    return parsed.hour * 60 + parsed.minute
+
+
+def format_minutes(minutes: int) -> str:
+    """
+    Format minutes since midnight as HH:MM
+    
+    Args:
+        minutes: Minutes since midnight
+    
+    Returns:
+        Time in HH:MM format
+    """
+    hour, minute = divmod(minutes, 60)
+    return f"{hour:02d}:{minute:02d}"
+
+
+def is_within_operating_hours(start_minutes: int, end_minutes: int, open_minutes: int, close_minutes: int) -> Tuple[bool, str]:
     """
     Check if booking time is within facility operating hours
     
     Args:
-        start_time: Booking start time in HH:MM format
-        end_time: Booking end time in HH:MM format
-        open_time: Facility open time in HH:MM format
-        close_time: Facility close time in HH:MM format
+        start_minutes: Booking start as minutes since midnight
+        end_minutes: Booking end as minutes since midnight (may exceed 24h)
+        open_minutes: Facility open time as minutes since midnight
+        close_minutes: Facility close time as minutes since midnight
     
     Returns:
         Tuple of (is_valid, error_message)
     """
-    try:
-        start = parse_time(start_time)
-        end = parse_time(end_time)
-        open_t = parse_time(open_time)
-        close_t = parse_time(close_time)
-        
-        if start < open_t:
-            return False, f"Facility opens at {open_time}"
-        
-        if end > close_t:
-            return False, f"Facility closes at {close_time}"
-        
-        return True, ""
-    except ValueError as e:
-        return False, str(e)
+    if start_minutes < open_minutes:
+        return False, f"Facility opens at {format_minutes(open_minutes)}"
+    
+    if end_minutes > close_minutes:
+        return False, f"Facility closes at {format_minutes(close_minutes)}"
+    
+    return True, ""
 
 
 def calculate_end_time(start_time: str, duration_minutes: int) -> str:
@@ -124,7 +159,5 @@ def calculate_end_time(start_time: str, duration_minutes: int) -> str:
     Returns:
         End time in HH:MM format
     """
-    start = parse_time(start_time)
-    start_dt = datetime.combine(datetime.today(), start)
-    end_dt = start_dt + timedelta(minutes=duration_minutes)
-    return end_dt.strftime("%H:%M")
+    end_minutes = time_to_minutes(start_time) + duration_minutes
+    return format_minutes(end_minutes % (24 * 60))
@@ -0,0 +1,101 @@
+from typing import Dict, List, Optional, Set
+import hashlib
+import hmac
+import secrets
+import time
+
+from config.settings import settings
+
+
+# Seconds an availability token can be redeemed by create_booking
+AVAILABILITY_TOKEN_TTL = 60
+
+# Without SESSION_SECRET, tokens are only valid in the issuing process
+_SECRET = (settings.session_secret or secrets.token_hex(32)).encode("utf-8")
+
+# Signature -> expiry of every token redeemed in this process, so each is used once
+_redeemed: Dict[str, float] = {}
+
+
+def _sign(facility_id: str, date: str, start_time: str, duration_minutes: int, courts: str, issued_at: int) -> str:
+    """HMAC-SHA256 over the slot, the free courts and the issue time"""
+    message = f"{facility_id}|{date}|{start_time}|{duration_minutes}|{courts}|{issued_at}"
+    return hmac.new(_SECRET, message.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def create_availability_token(
+    facility_id: str,
+    date: str,
+    start_time: str,
+    duration_minutes: int,
+    free_courts: List[int]
+) -> str:
+    """
+    Create a signed token vouching that courts were free for a slot
+    
+    Args:
+        facility_id: Facility identifier
+        date: Date in YYYY-MM-DD format
+        start_time: Start time in HH:MM format
+        duration_minutes: Duration in minutes
+        free_courts: Court numbers found free
+    
+    Returns:
+        Token in "<issued_at>.<courts>.<signature>" format
+    """
+    issued_at = int(time.time())
+    courts = ",".join(map(str, free_courts))
+    signature = _sign(facility_id, date, start_time, duration_minutes, courts, issued_at)
+    return f"{issued_at}.{courts}.{signature}"
+
+
+def verify_availability_token(
+    token: str,
+    facility_id: str,
+    date: str,
+    start_time: str,
+    duration_minutes: int,
+    not_before: float = 0.0
+) -> Optional[Set[int]]:
+    """
+    Verify and redeem an availability token for the slot being booked
+    
+    A token is accepted once; replaying it (e.g. a retried create_booking)
+    returns None so the caller falls back to a live calendar check.
+    
+    Args:
+        token: Token from create_availability_token
+        facility_id: Facility identifier
+        date: Date in YYYY-MM-DD format
+        start_time: Start time in HH:MM format
+        duration_minutes: Duration in minutes
+        not_before: Reject tokens issued before this Unix time (e.g. the last booking)
+    
+    Returns:
+        Set of free court numbers, or None if the token is invalid, expired,
+        stale or already redeemed
+    """
+    try:
+        issued_at_str, courts, signature = token.split(".")
+        issued_at = int(issued_at_str)
+        free_courts = {int(c) for c in courts.split(",") if c}
+    except ValueError:
+        return None
+    
+    now = time.time()
+    if not 0 <= now - issued_at <= AVAILABILITY_TOKEN_TTL:
+        return None
+    
+    expected = _sign(facility_id, date, start_time, duration_minutes, courts, issued_at)
+    # Compare bytes: str compare_digest raises TypeError on non-ASCII input
+    if not hmac.compare_digest(signature.encode("utf-8"), expected.encode("utf-8")):
+        return None
+    
+    if issued_at < not_before or signature in _redeemed:
+        return None
+    
+    for expired in [sig for sig, expires_at in _redeemed.items() if expires_at < now]:
+        del _redeemed[expired]
+    _redeemed[signature] = issued_at + AVAILABILITY_TOKEN_TTL
+    
+    return free_courts